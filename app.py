@@ -1,9 +1,20 @@
+# Patch blocking I/O for gevent workers before anything else is imported.
+# sqlite3 is a C extension gevent cannot patch: a query, or a wait on another
+# process's write lock, blocks every greenlet in the worker until it returns.
+from gevent import monkey
+monkey.patch_all()
+
 import os
 import logging
-from flask import Flask, request
+import sqlite3
+from xml.sax.saxutils import escape
+from flask import Flask, Response, request, stream_template
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from date_utils import format_date_for_display, format_time_for_display
 
 # Set up logging for debugging
 logging.basicConfig(level=logging.DEBUG)
@@ -17,20 +28,100 @@ db = SQLAlchemy(model_class=Base)
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "fallback_secret_key_for_whatsapp_bot")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+app.jinja_env.globals.update(
+    format_date_for_display=format_date_for_display,
+    format_time_for_display=format_time_for_display,
+)
 
 # Configure SQLite database
+# The default bind is the single writer; reads go through the "ro" bind so the
+# dashboard and availability checks never queue behind the write lock
+READ_ONLY_BIND = "ro"
+
 app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///appointments.db"
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
+    "pool_size": 1,
+    "max_overflow": 0,
+    # Greenlets queued for the single writer give up quickly under a burst
+    "pool_timeout": 5,
+}
+app.config["SQLALCHEMY_BINDS"] = {
+    READ_ONLY_BIND: {
+        "url": "sqlite:///file:appointments.db?mode=ro&uri=true",
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+        "pool_size": int(os.environ.get("DB_READ_POOL_SIZE", "5")),
+    },
 }
 
 # Initialize the app with the extension
 db.init_app(app)
 
-# Import bot handler after app creation
+# Tune SQLite on every new connection: WAL lets the dashboard read while the
+# webhook writes, and NORMAL sync cuts fsync cost per commit
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "busy_timeout=1000",  # Short: this wait blocks the whole gevent worker
+    "temp_store=memory",
+    "cache_size=-20000",
+    "foreign_keys=ON",
+)
+
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Apply SQLite PRAGMAs when a new DBAPI connection is opened
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+def _disable_pysqlite_autobegin(dbapi_connection, connection_record):
+    """
+    Let SQLAlchemy emit BEGIN itself instead of the sqlite3 module
+    """
+    dbapi_connection.isolation_level = None
+
+def _begin_immediate(conn):
+    """
+    Take the write lock when the transaction starts, not on the first write
+    """
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def _enable_mmap(dbapi_connection, connection_record):
+    """
+    Memory-map up to 256 MB of the database file for read-heavy connections
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+with app.app_context():
+    write_engine = db.engines[None]
+    event.listen(write_engine, "connect", _disable_pysqlite_autobegin)
+    event.listen(write_engine, "begin", _begin_immediate)
+    event.listen(db.engines[READ_ONLY_BIND], "connect", _enable_mmap)
+
+# Import models and bot handler after app creation
+from models import Appointment, execute_read
 from bot_handler import handle_whatsapp_message
 
+# Every reply is a single <Message>, so fill in a fixed TwiML document instead
+# of building one with the Twilio SDK on each request
+_TWIML_TMPL = '<?xml version="1.0" encoding="UTF-8"?><Response><Message>{}</Message></Response>'
+
+def twiml_message(body):
+    """
+    Wrap a reply in a TwiML response
+    """
+    return Response(_TWIML_TMPL.format(escape(body)), mimetype='application/xml')
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     """
@@ -49,19 +140,12 @@ def webhook():
         app.logger.info(f"Sending response: {response}")
         
         # Return TwiML response
-        from twilio.twiml.messaging_response import MessagingResponse
-        twiml_response = MessagingResponse()
-        twiml_response.message(response)
-        
-        return str(twiml_response)
+        return twiml_message(response)
         
     except Exception as e:
         app.logger.error(f"Error processing webhook: {str(e)}")
         # Return a generic error message
-        from twilio.twiml.messaging_response import MessagingResponse
-        twiml_response = MessagingResponse()
-        twiml_response.message("Sorry, I'm having trouble processing your request. Please try again later.")
-        return str(twiml_response)
+        return twiml_message("Sorry, I'm having trouble processing your request. Please try again later.")
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -75,159 +159,22 @@ def index():
     """
     Simple admin dashboard to view appointments
     """
-    from models import Appointment
-    appointments = Appointment.query.order_by(Appointment.created_at.desc()).limit(20).all()
-    
-    html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>WhatsApp Appointment Bot</title>
-        <link href="https://cdn.replit.com/agent/bootstrap-agent-dark-theme.min.css" rel="stylesheet">
-        <style>
-            .status-confirmed { color: var(--bs-success); }
-            .status-cancelled { color: var(--bs-danger); }
-        </style>
-    </head>
-    <body>
-        <div class="container mt-4">
-            <div class="row">
-                <div class="col-md-12">
-                    <h1 class="mb-4">🤖 WhatsApp Appointment Bot Dashboard</h1>
-                    
-                    <div class="row mb-4">
-                        <div class="col-md-6">
-                            <div class="card">
-                                <div class="card-body">
-                                    <h5 class="card-title">📋 Bot Status</h5>
-                                    <p class="card-text">
-                                        <span class="badge bg-success">✅ Active</span><br>
-                                        Ready to receive WhatsApp messages
-                                    </p>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="col-md-6">
-                            <div class="card">
-                                <div class="card-body">
-                                    <h5 class="card-title">🔗 Webhook URL</h5>
-                                    <p class="card-text">
-                                        <code>/webhook</code><br>
-                                        <small class="text-muted">Configure this in your Twilio Console</small>
-                                    </p>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                    
-                    <div class="card">
-                        <div class="card-header">
-                            <h5 class="mb-0">📅 Recent Appointments</h5>
-                        </div>
-                        <div class="card-body">
-    """
-    
-    if appointments:
-        html += """
-                            <div class="table-responsive">
-                                <table class="table table-striped">
-                                    <thead>
-                                        <tr>
-                                            <th>Name</th>
-                                            <th>Date</th>
-                                            <th>Time</th>
-                                            <th>Phone</th>
-                                            <th>Status</th>
-                                            <th>Created</th>
-                                        </tr>
-                                    </thead>
-                                    <tbody>
-        """
-        
-        for apt in appointments:
-            from date_utils import format_date_for_display, format_time_for_display
-            status_class = "status-confirmed" if apt.status == "confirmed" else "status-cancelled"
-            html += f"""
-                                        <tr>
-                                            <td><strong>{apt.name}</strong></td>
-                                            <td>{format_date_for_display(apt.date)}</td>
-                                            <td>{format_time_for_display(apt.time)}</td>
-                                            <td><small>{apt.phone_number}</small></td>
-                                            <td><span class="{status_class}">●</span> {apt.status.title()}</td>
-                                            <td><small>{apt.created_at.strftime('%d/%m/%Y %H:%M')}</small></td>
-                                        </tr>
-            """
-        
-        html += """
-                                    </tbody>
-                                </table>
-                            </div>
-        """
-    else:
-        html += """
-                            <div class="text-center py-4">
-                                <p class="text-muted">No appointments yet. Users can start booking through WhatsApp!</p>
-                            </div>
-        """
-    
-    html += """
-                        </div>
-                    </div>
-                    
-                    <div class="row mt-4">
-                        <div class="col-md-12">
-                            <div class="card">
-                                <div class="card-header">
-                                    <h5 class="mb-0">💬 Available Commands</h5>
-                                </div>
-                                <div class="card-body">
-                                    <div class="row">
-                                        <div class="col-md-6">
-                                            <h6>📅 Book Appointment</h6>
-                                            <code>Book [Name] [DD-MM-YYYY] [HH:MM]</code>
-                                            <p class="small text-muted mt-1">Example: Book John Doe 25-08-2025 14:30</p>
-                                        </div>
-                                        <div class="col-md-6">
-                                            <h6>📋 View Appointments</h6>
-                                            <code>My appointments</code>
-                                            <p class="small text-muted mt-1">Shows all upcoming bookings</p>
-                                        </div>
-                                    </div>
-                                    <div class="row mt-3">
-                                        <div class="col-md-6">
-                                            <h6>❌ Cancel Appointment</h6>
-                                            <code>Cancel [DD-MM-YYYY] [HH:MM]</code>
-                                            <p class="small text-muted mt-1">Example: Cancel 25-08-2025 14:30</p>
-                                        </div>
-                                        <div class="col-md-6">
-                                            <h6>❓ Get Help</h6>
-                                            <code>Help</code>
-                                            <p class="small text-muted mt-1">Shows all available commands</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                    
-                    <div class="mt-4 text-center">
-                        <p class="text-muted">
-                            <small>Business Hours: 9:00 AM - 5:00 PM | Available Slots: Every 30 minutes</small>
-                        </p>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    # Plain rows with only the displayed columns, no ORM instances
+    appointments = execute_read(
+        db.select(
+            Appointment.name,
+            Appointment.date,
+            Appointment.time_min,
+            Appointment.phone_number,
+            Appointment.status,
+            Appointment.created_at
+        ).order_by(Appointment.created_at.desc()).limit(20)
+    ).all()
     
-    return html
+    return Response(stream_template('dashboard.html', appointments=appointments))
 
 # Create database tables
 with app.app_context():
-    # Import models to ensure tables are created
-    import models
     db.create_all()
     app.logger.info("Database tables created successfully")
 
@@ -1,13 +1,19 @@
 import re
 import os
 from app import db
-from models import Appointment
+from models import Appointment, execute_read
 from date_utils import (
     is_valid_date_time, 
     format_date_for_display, 
     format_time_for_display,
-    parse_cancel_message
+    parse_cancel_message,
+    parse_date,
+    parse_time,
+    date_to_str,
+    minutes_to_str
 )
+from cachetools import TTLCache
+from sqlalchemy.exc import IntegrityError
 from twilio.rest import Client
 
 # Twilio configuration
@@ -15,14 +21,82 @@ TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.environ.get("TWILIO_PHONE_NUMBER")
 
+# Shared Twilio client so outbound messages reuse one HTTP session
+_TWILIO = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN) if TWILIO_ACCOUNT_SID else None
+
+# Booking message patterns, compiled once at import
+_BOOK_RE = re.compile(r'book\s+(.+?)\s+(\d{2}-\d{2}-\d{4})\s+(\d{1,2}:\d{2})', re.IGNORECASE)
+_DATE_RE = re.compile(r'(\d{2}-\d{2}-\d{4})')
+_TIME_RE = re.compile(r'(\d{1,2}:\d{2})')
+_STRIP_RE = re.compile(r'\b(book|appointment|for|my name is|i am|i\'m|want to|need|on|at)\b', re.IGNORECASE)
+_WS_RE = re.compile(r'\s+')
+
+# Message intent, matched in one pass over the lowercased message. The
+# anchored alternatives are tried first, so exact commands and a leading
+# "cancel" win over booking keywords found later in the text.
+_INTENT_RE = re.compile(
+    r'^(?:(?P<list>(?:my )?appointments|my bookings|view appointments)$'
+    r'|(?P<cancel>cancel)'
+    r'|(?P<help>help|menu|commands)$)'
+    r'|(?P<book>book|appointment|schedule|meeting)'
+)
+
+# Static replies
+HELP_MESSAGE = """Welcome to our Appointment Booking Bot! 👋
+
+Available commands:
+
+📅 **Book an appointment:**
+Book [Your Name] [DD-MM-YYYY] [HH:MM]
+Example: Book John Doe 15-08-2025 14:30
+
+📋 **View your appointments:**
+Type "My appointments"
+
+❌ **Cancel an appointment:**
+Cancel [DD-MM-YYYY] [HH:MM]
+Example: Cancel 15-08-2025 14:30
+
+ℹ️ **Business hours:** 9:00 AM - 5:00 PM
+**Available slots:** Every 30 minutes
+
+Need help? Just type "help" anytime!"""
+
+DEFAULT_MESSAGE = """Hi there! 👋 I'm your appointment booking assistant.
+
+To book an appointment, send:
+Book [Your Name] [DD-MM-YYYY] [HH:MM]
+
+Example: Book John Doe 15-08-2025 14:30
+
+Other commands:
+• "My appointments" - View your bookings
+• "Cancel [date] [time]" - Cancel a booking
+• "Help" - See all commands
+
+How can I help you today?"""
+
+NO_APPOINTMENTS_MESSAGE = """You don't have any upcoming appointments. 📅
+
+To book a new appointment, send:
+Book [Your Name] [DD-MM-YYYY] [HH:MM]
+
+Example: Book John Doe 15-08-2025 14:30"""
+
+# Recent "my appointments" replies per phone number; cleared when a booking
+# or cancellation for that number commits
+_VIEW_CACHE = TTLCache(maxsize=1024, ttl=5)
+
 def send_twilio_message(to_phone_number: str, message: str) -> None:
     """
     Send a message via Twilio WhatsApp API
     """
+    if _TWILIO is None:
+        print("Error sending message: Twilio credentials are not configured")
+        return
+    
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        
-        message = client.messages.create(
+        message = _TWILIO.messages.create(
             body=message,
             from_=TWILIO_PHONE_NUMBER,
             to=to_phone_number
@@ -43,8 +117,7 @@ def extract_booking_details(message):
     message = message.strip()
     
     # Pattern 1: "Book [Name] [Date] [Time]"
-    pattern1 = r'book\s+(.+?)\s+(\d{2}-\d{2}-\d{4})\s+(\d{1,2}:\d{2})'
-    match = re.search(pattern1, message, re.IGNORECASE)
+    match = _BOOK_RE.search(message)
     
     if match:
         name = match.group(1).strip()
@@ -59,11 +132,8 @@ def extract_booking_details(message):
         return name, date, time
     
     # Pattern 2: Look for date and time patterns anywhere in the message
-    date_pattern = r'(\d{2}-\d{2}-\d{4})'
-    time_pattern = r'(\d{1,2}:\d{2})'
-    
-    date_match = re.search(date_pattern, message)
-    time_match = re.search(time_pattern, message)
+    date_match = _DATE_RE.search(message)
+    time_match = _TIME_RE.search(message)
     
     if date_match and time_match:
         date = date_match.group(1)
@@ -78,8 +148,8 @@ def extract_booking_details(message):
         message_before_date = message[:date_match.start()].strip()
         
         # Remove common booking words and extract name
-        name_text = re.sub(r'\b(book|appointment|for|my name is|i am|i\'m|want to|need|on|at)\b', '', message_before_date, flags=re.IGNORECASE)
-        name = re.sub(r'\s+', ' ', name_text).strip()
+        name_text = _STRIP_RE.sub('', message_before_date)
+        name = _WS_RE.sub(' ', name_text).strip()
         
         if name and len(name) > 1:
             return name, date, time
@@ -116,42 +186,24 @@ Please ensure:
 
 Please try again with a valid date and time."""
     
-    # Check if slot is available
-    if not Appointment.is_slot_available(date, time):
-        # Find next available slot
-        next_date, next_time = Appointment.find_next_available_slot(date, time)
-        
-        if next_date and next_time:
-            next_date_display = format_date_for_display(next_date)
-            next_time_display = format_time_for_display(next_time)
-            
-            return f"""Sorry {name}, the slot on {format_date_for_display(date)} at {format_time_for_display(time)} is already booked. ❌
-
-The next available slot is:
-📅 {next_date_display} at {next_time_display}
-
-Would you like to book this slot instead? If yes, please send:
-Book {name} {next_date} {next_time}"""
-        else:
-            return f"""Sorry {name}, the slot on {format_date_for_display(date)} at {format_time_for_display(time)} is not available, and I couldn't find any available slots in the next 7 days. ❌
-
-Please try booking for a later date or contact us directly."""
+    date, time_min = parse_date(date), parse_time(time)
     
-    # Create the appointment
+    # Create the appointment; the unique slot index rejects double bookings
     try:
         appointment = Appointment(
             name=name,
             phone_number=phone_number,
             date=date,
-            time=time,
+            time_min=time_min,
             status='confirmed'
         )
         
         db.session.add(appointment)
         db.session.commit()
+        _VIEW_CACHE.pop(phone_number, None)
         
         date_display = format_date_for_display(date)
-        time_display = format_time_for_display(time)
+        time_display = format_time_for_display(time_min)
         
         return f"""Hello {name}, your appointment for {date_display} at {time_display} is confirmed! ✅
 
@@ -163,28 +215,55 @@ Appointment Details:
 
 We look forward to seeing you! If you need to cancel or reschedule, just let me know."""
         
+    except IntegrityError:
+        db.session.rollback()
+        return handle_slot_unavailable(name, date, time_min)
+        
     except Exception as e:
+        db.session.rollback()
         return f"Sorry {name}, there was an error booking your appointment. Please try again later."
 
+def handle_slot_unavailable(name, date, time_min):
+    """
+    Suggest the next available slot when the requested one is taken
+    """
+    next_date, next_time = Appointment.find_next_available_slot(date, time_min)
+    
+    if next_date is not None and next_time is not None:
+        next_date_display = format_date_for_display(next_date)
+        next_time_display = format_time_for_display(next_time)
+        
+        return f"""Sorry {name}, the slot on {format_date_for_display(date)} at {format_time_for_display(time_min)} is already booked. ❌
+
+The next available slot is:
+📅 {next_date_display} at {next_time_display}
+
+Would you like to book this slot instead? If yes, please send:
+Book {name} {date_to_str(next_date)} {minutes_to_str(next_time)}"""
+    else:
+        return f"""Sorry {name}, the slot on {format_date_for_display(date)} at {format_time_for_display(time_min)} is not available, and I couldn't find any available slots in the next 7 days. ❌
+
+Please try booking for a later date or contact us directly."""
+
 def handle_view_appointments(phone_number):
     """
     Handle requests to view appointments
     """
+    cached = _VIEW_CACHE.get(phone_number)
+    if cached is not None:
+        return cached
+    
     appointments = Appointment.get_user_appointments(phone_number)
     
     if not appointments:
-        return """You don't have any upcoming appointments. 📅
-
-To book a new appointment, send:
-Book [Your Name] [DD-MM-YYYY] [HH:MM]
-
-Example: Book John Doe 15-08-2025 14:30"""
+        _VIEW_CACHE[phone_number] = NO_APPOINTMENTS_MESSAGE
+        return NO_APPOINTMENTS_MESSAGE
     
     response = "Your upcoming appointments: 📅\n\n"
     
     for apt in appointments:
         date_display = format_date_for_display(apt.date)
-        time_display = format_time_for_display(apt.time)
+        time_display = format_time_for_display(apt.time_min)
         
         response += f"👤 {apt.name}\n"
         response += f"📅 {date_display}\n"
@@ -194,15 +273,17 @@ Example: Book John Doe 15-08-2025 14:30"""
     
     response += "\nTo cancel an appointment, send:\nCancel [DD-MM-YYYY] [HH:MM]"
     
+    _VIEW_CACHE[phone_number] = response
     return response
 
 def handle_cancel_appointment(message, phone_number):
     """
     Handle appointment cancellation requests
     """
-    date, time = parse_cancel_message(message)
+    date_str, time_str = parse_cancel_message(message)
+    date, time_min = parse_date(date_str), parse_time(time_str)
     
-    if not date or not time:
+    if date is None or time_min is None:
         return """To cancel an appointment, please use this format:
 Cancel [DD-MM-YYYY] [HH:MM]
 
@@ -210,40 +291,54 @@ Example: Cancel 15-08-2025 14:30
 
 To see your appointments, type "My appointments" """
     
-    # Find the appointment
-    appointment = Appointment.query.filter_by(
-        phone_number=phone_number,
-        date=date,
-        time=time,
-        status='confirmed'
-    ).first()
+    # Find the appointment on the read-only engine; the writer is only used
+    # for the UPDATE, so a missing appointment never takes the write lock
+    appointment = execute_read(
+        db.select(Appointment).filter_by(
+            phone_number=phone_number,
+            date=date,
+            time_min=time_min,
+            status='confirmed'
+        ).limit(1)
+    ).scalars().first()
     
     if not appointment:
         date_display = format_date_for_display(date)
-        time_display = format_time_for_display(time)
+        time_display = format_time_for_display(time_min)
         
         return f"""No confirmed appointment found for {date_display} at {time_display}. ❌
 
 To see your appointments, type "My appointments" """
     
+    # Keep what the reply needs: committing expires the instance, and
+    # reloading it would start another transaction on the writer
+    name = appointment.name
+    
     try:
-        # Cancel the appointment
-        appointment.status = 'cancelled'
+        # Cancel the appointment with a plain UPDATE on the writer
+        db.session.execute(
+            db.update(Appointment)
+            .where(Appointment.id == appointment.id, Appointment.status == 'confirmed')
+            .values(status='cancelled')
+            .execution_options(synchronize_session=False)
+        )
         db.session.commit()
+        _VIEW_CACHE.pop(phone_number, None)
         
         date_display = format_date_for_display(date)
-        time_display = format_time_for_display(time)
+        time_display = format_time_for_display(time_min)
         
         return f"""Your appointment has been cancelled successfully! ✅
 
 Cancelled Appointment:
-👤 Name: {appointment.name}
+👤 Name: {name}
 📅 Date: {date_display}
 🕐 Time: {time_display}
 
 The slot is now available for other bookings. Thank you!"""
         
     except Exception as e:
+        db.session.rollback()
         return "Sorry, there was an error cancelling your appointment. Please try again later."
 
 def handle_whatsapp_message(message, phone_number):
@@ -253,49 +348,22 @@ def handle_whatsapp_message(message, phone_number):
     message = message.strip()
     message_lower = message.lower()
     
+    match = _INTENT_RE.search(message_lower)
+    intent = match.lastgroup if match else None
+    
     # Handle different types of messages
-    if message_lower in ['my appointments', 'appointments', 'my bookings', 'view appointments']:
+    if intent == 'list':
         return handle_view_appointments(phone_number)
     
-    elif message_lower.startswith('cancel'):
+    elif intent == 'cancel':
         return handle_cancel_appointment(message, phone_number)
     
-    elif 'book' in message_lower or any(keyword in message_lower for keyword in ['appointment', 'schedule', 'meeting']):
+    elif intent == 'book':
         return handle_appointment_booking(message, phone_number)
     
-    elif message_lower in ['help', 'menu', 'commands']:
-        return """Welcome to our Appointment Booking Bot! 👋
-
-Available commands:
-
-📅 **Book an appointment:**
-Book [Your Name] [DD-MM-YYYY] [HH:MM]
-Example: Book John Doe 15-08-2025 14:30
-
-📋 **View your appointments:**
-Type "My appointments"
-
-❌ **Cancel an appointment:**
-Cancel [DD-MM-YYYY] [HH:MM]
-Example: Cancel 15-08-2025 14:30
-
-ℹ️ **Business hours:** 9:00 AM - 5:00 PM
-**Available slots:** Every 30 minutes
-
-Need help? Just type "help" anytime!"""
+    elif intent == 'help':
+        return HELP_MESSAGE
     
     else:
         # Default response for unrecognized messages
-        return """Hi there! 👋 I'm your appointment booking assistant.
-
-To book an appointment, send:
-Book [Your Name] [DD-MM-YYYY] [HH:MM]
-
-Example: Book John Doe 15-08-2025 14:30
-
-Other commands:
-• "My appointments" - View your bookings
-• "Cancel [date] [time]" - Cancel a booking
-• "Help" - See all commands
-
-How can I help you today?"""
+        return DEFAULT_MESSAGE
@@ -1,17 +1,32 @@
 import re
+from functools import lru_cache
 from datetime import datetime, timedelta
 
+# Patterns compiled once at import
+_CANCEL_PREFIX_RE = re.compile(r'^cancel\s+')
+_CANCEL_PATTERNS = (
+    re.compile(r'(\d{2}-\d{2}-\d{4})\s+(\d{1,2}:\d{2})'),  # DD-MM-YYYY HH:MM
+    re.compile(r'(\d{2}-\d{2}-\d{4})\s+at\s+(\d{1,2}:\d{2})'),  # DD-MM-YYYY at HH:MM
+)
+
+def _is_ascii_digits(text):
+    """
+    Check that a string contains only the characters 0-9
+    """
+    return text.isascii() and text.isdigit()
+
 def is_valid_date_format(date_str):
     """
     Validate date format DD-MM-YYYY
     """
-    pattern = r'^(\d{2})-(\d{2})-(\d{4})$'
-    match = re.match(pattern, date_str)
-    
-    if not match:
+    if (len(date_str) != 10 or date_str[2] != '-' or date_str[5] != '-'
+            or not _is_ascii_digits(date_str[:2] + date_str[3:5] + date_str[6:])):
         return False
     
-    day, month, year = map(int, match.groups())
+    d = [ord(c) - 48 for c in date_str]
+    day = d[0] * 10 + d[1]
+    month = d[3] * 10 + d[4]
+    year = d[6] * 1000 + d[7] * 100 + d[8] * 10 + d[9]
     
     try:
         # Check if the date is valid
@@ -30,23 +45,14 @@ def is_valid_time_format(time_str):
     """
     Validate time format HH:MM (24-hour format)
     """
-    pattern = r'^([01]?[0-9]|2[0-3]):([0-5][0-9])$'
-    match = re.match(pattern, time_str)
-    
-    if not match:
+    if len(time_str) != 5 or time_str[2] != ':' or not _is_ascii_digits(time_str[:2] + time_str[3:]):
         return False
     
-    hour, minute = map(int, match.groups())
-    
-    # Check business hours (9 AM to 5 PM)
-    if hour < 9 or hour >= 17:
-        return False
+    hour = (ord(time_str[0]) - 48) * 10 + ord(time_str[1]) - 48
+    minute = (ord(time_str[3]) - 48) * 10 + ord(time_str[4]) - 48
     
-    # Only allow appointments on the hour or half-hour
-    if minute not in [0, 30]:
-        return False
-        
-    return True
+    # Business hours (9 AM to 5 PM), on the hour or half-hour only
+    return 9 <= hour < 17 and minute in (0, 30)
 
 def is_valid_date_time(date_str, time_str):
     """
@@ -71,27 +77,55 @@ def is_valid_date_time(date_str, time_str):
     except ValueError:
         return False
 
-def format_date_for_display(date_str):
+def parse_date(date_str):
     """
-    Convert DD-MM-YYYY to a more readable format
+    Convert DD-MM-YYYY to a date, or None if it is not a real date
     """
     try:
-        day, month, year = date_str.split('-')
-        date_obj = datetime(int(year), int(month), int(day))
-        return date_obj.strftime('%d %B %Y')
-    except:
-        return date_str
+        return datetime.strptime(date_str, '%d-%m-%Y').date()
+    except (TypeError, ValueError):
+        return None
 
-def format_time_for_display(time_str):
+def parse_time(time_str):
     """
-    Convert HH:MM to 12-hour format
+    Convert HH:MM to minutes since midnight, or None if it is not a valid time
     """
     try:
         hour, minute = map(int, time_str.split(':'))
-        time_obj = datetime.strptime(f"{hour}:{minute}", "%H:%M")
-        return time_obj.strftime('%I:%M %p')
-    except:
-        return time_str
+    except (AttributeError, ValueError):
+        return None
+    
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    
+    return hour * 60 + minute
+
+def date_to_str(date_obj):
+    """
+    Convert a date back to DD-MM-YYYY
+    """
+    return date_obj.strftime('%d-%m-%Y')
+
+def minutes_to_str(minutes):
+    """
+    Convert minutes since midnight back to HH:MM
+    """
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+@lru_cache(maxsize=4096)
+def format_date_for_display(date_obj):
+    """
+    Convert a date to a more readable format
+    """
+    return date_obj.strftime('%d %B %Y')
+
+@lru_cache(maxsize=4096)
+def format_time_for_display(minutes):
+    """
+    Convert minutes since midnight to 12-hour format
+    """
+    hour, minute = divmod(minutes, 60)
+    return f"{(hour - 1) % 12 + 1:02d}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
 
 def get_next_time_slot(date_str, time_str):
     """
@@ -122,16 +156,11 @@ def parse_cancel_message(message):
     Expected format: "Cancel DD-MM-YYYY HH:MM" or "Cancel DD-MM-YYYY at HH:MM"
     """
     # Remove "cancel" and normalize the message
-    message = re.sub(r'^cancel\s+', '', message.lower().strip())
+    message = _CANCEL_PREFIX_RE.sub('', message.lower().strip())
     
     # Try different patterns
-    patterns = [
-        r'(\d{2}-\d{2}-\d{4})\s+(\d{1,2}:\d{2})',  # DD-MM-YYYY HH:MM
-        r'(\d{2}-\d{2}-\d{4})\s+at\s+(\d{1,2}:\d{2})',  # DD-MM-YYYY at HH:MM
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, message)
+    for pattern in _CANCEL_PATTERNS:
+        match = pattern.search(message)
         if match:
             date_str = match.group(1)
             time_str = match.group(2)
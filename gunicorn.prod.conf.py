@@ -0,0 +1,30 @@
+"""
+Production gunicorn configuration for the WhatsApp Appointment Booking Bot
+
+Pass it explicitly with: gunicorn -c gunicorn.prod.conf.py app:app
+It is not named gunicorn.conf.py so the development command, which gunicorn
+would otherwise auto-configure from that file, keeps --reload working.
+"""
+
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+worker_class = "gevent"
+# Greenlets overlap on network I/O (Twilio, slow clients), but SQLite calls
+# block the whole worker and writes share one connection per worker, so keep
+# the number of in-flight requests per worker modest
+worker_connections = 100
+
+# Import the app once in the master so workers share its code pages
+preload_app = True
+
+def post_fork(server, worker):
+    """
+    Give each worker its own database connections instead of the master's
+    """
+    from app import app, db
+    
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Migrate an existing appointments database from text date/time columns
+(DD-MM-YYYY and HH:MM) to a DATE column and minutes since midnight
+"""
+
+import sys
+
+from sqlalchemy import inspect, text
+
+from app import app, db
+
+OLD_INDEXES = ["ix_appt_slot", "ix_appt_user", "ix_appt_created", "uq_appt_slot"]
+
+def needs_migration():
+    """Check whether the appointments table still has the old text columns"""
+    columns = {column["name"] for column in inspect(db.engine).get_columns("appointments")}
+    return "time" in columns and "time_min" not in columns
+
+def migrate():
+    """Rebuild the appointments table with the new column layout"""
+    with db.engine.begin() as conn:
+        conn.execute(text("ALTER TABLE appointments RENAME TO appointments_old"))
+        for index_name in OLD_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+        db.metadata.create_all(conn)
+
+        conn.execute(text("""
+            INSERT INTO appointments (id, name, phone_number, date, time_min, status, created_at)
+            SELECT
+                id,
+                name,
+                phone_number,
+                substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2),
+                CAST(substr(time, 1, 2) AS INTEGER) * 60 + CAST(substr(time, 4, 2) AS INTEGER),
+                status,
+                created_at
+            FROM appointments_old
+        """))
+        conn.execute(text("DROP TABLE appointments_old"))
+
+def main():
+    """Main migration function"""
+    with app.app_context():
+        if not needs_migration():
+            print("✅ Database already uses the new date/time columns.")
+            return
+
+        print("Migrating appointments table...")
+        try:
+            migrate()
+        except Exception as e:
+            print(f"❌ Error migrating database: {e}")
+            sys.exit(1)
+        print("✅ Migration complete!")
+
+if __name__ == "__main__":
+    main()
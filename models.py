@@ -1,22 +1,61 @@
-from app import db
-from datetime import datetime
+from app import db, READ_ONLY_BIND
+from datetime import datetime, timedelta
+from date_utils import date_to_str, minutes_to_str, is_valid_date_time
+
+# Bookable slots in minutes since midnight: every 30 minutes from 9:00 to 16:30
+BUSINESS_SLOTS = tuple(hour * 60 + minute for hour in range(9, 17) for minute in (0, 30))
+
+def execute_read(statement, params=None):
+    """
+    Run a SELECT on the read-only engine instead of the writer
+    """
+    return db.session.execute(
+        statement,
+        params,
+        bind_arguments={"bind": db.engines[READ_ONLY_BIND]}
+    )
+
+# Keep IN lists well below SQLite's default limit of 999 bound variables
+IN_CHUNK_SIZE = 500
+
+def execute_read_in(statement, column, values, chunk_size=IN_CHUNK_SIZE):
+    """
+    Run a SELECT filtered by column IN values on the read-only engine,
+    splitting the values into batches, and return all rows
+    """
+    values = list(values)
+    rows = []
+    
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        rows.extend(execute_read(statement.where(column.in_(chunk))).all())
+        
+    return rows
 
 class Appointment(db.Model):
     """
     Model for storing appointment bookings
     """
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('ix_appt_slot', 'date', 'time_min', 'status'),  # slot availability
+        db.Index('ix_appt_user', 'phone_number', 'status', 'date', 'time_min'),  # user's bookings
+        db.Index('ix_appt_created', 'created_at'),  # dashboard's recent list
+        # One confirmed booking per slot, enforced by the database
+        db.Index('uq_appt_slot', 'date', 'time_min', unique=True,
+                 sqlite_where=db.text("status = 'confirmed'")),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     phone_number = db.Column(db.String(20), nullable=False)  # WhatsApp number
-    date = db.Column(db.String(10), nullable=False)  # Format: DD-MM-YYYY
-    time = db.Column(db.String(5), nullable=False)   # Format: HH:MM
+    date = db.Column(db.Date, nullable=False)
+    time_min = db.Column(db.SmallInteger, nullable=False)  # Minutes since midnight
     status = db.Column(db.String(20), nullable=False, default='confirmed')  # confirmed, cancelled
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f'<Appointment {self.name} on {self.date} at {self.time}>'
+        return f'<Appointment {self.name} on {date_to_str(self.date)} at {minutes_to_str(self.time_min)}>'
     
     def to_dict(self):
         """
@@ -26,38 +65,33 @@ class Appointment(db.Model):
             'id': self.id,
             'name': self.name,
             'phone_number': self.phone_number,
-            'date': self.date,
-            'time': self.time,
+            'date': date_to_str(self.date),
+            'time': minutes_to_str(self.time_min),
             'status': self.status,
             'created_at': self.created_at
         }
     
     @staticmethod
-    def is_slot_available(date, time, exclude_id=None):
+    def is_slot_available(date, time_min, exclude_id=None):
         """
         Check if a specific date/time slot is available
         """
-        query = Appointment.query.filter_by(
-            date=date, 
-            time=time, 
-            status='confirmed'
-        )
+        query = _SLOT_STMT
         
         # Exclude specific appointment ID (useful for updates)
         if exclude_id:
             query = query.filter(Appointment.id != exclude_id)
             
-        return query.first() is None
+        params = {'date': date, 'time_min': time_min}
+        return execute_read(query, params).first() is None
     
     @staticmethod
     def get_user_appointments(phone_number):
         """
         Get all confirmed appointments for a specific phone number
         """
-        return Appointment.query.filter_by(
-            phone_number=phone_number,
-            status='confirmed'
-        ).order_by(Appointment.date, Appointment.time).all()
+        params = {'phone_number': phone_number}
+        return execute_read(_USER_APPOINTMENTS_STMT, params).scalars().all()
     
     @staticmethod
     def find_next_available_slot(preferred_date, preferred_time):
@@ -65,21 +99,40 @@ class Appointment(db.Model):
         Find the next available appointment slot after the preferred time
         This is a simple implementation - in a real app, you'd have business hours logic
         """
-        from date_utils import get_next_time_slot, is_valid_date_time
+        # Candidate days: the preferred date and the 6 days after it
+        dates = [preferred_date + timedelta(days=day_offset) for day_offset in range(7)]
         
-        # Start checking from the preferred time
-        current_date = preferred_date
-        current_time = preferred_time
+        # Fetch every booked slot in the window with one query
+        params = {'start': dates[0], 'end': dates[-1]}
+        booked = set(execute_read(_BOOKED_SLOTS_STMT, params).all())
         
-        # Check next 7 days, 8 hours per day (9 AM to 5 PM)
-        for day_offset in range(7):
-            for hour in range(9, 17):  # 9 AM to 4 PM (last slot)
-                check_time = f"{hour:02d}:00"
-                
-                if Appointment.is_slot_available(current_date, check_time):
-                    return current_date, check_time
-            
-            # Move to next day
-            current_date = get_next_time_slot(current_date, "00:00")[0]
+        for check_date in dates:
+            for check_time in BUSINESS_SLOTS:
+                # Only offer slots after the requested one that booking would accept
+                if (check_date, check_time) <= (preferred_date, preferred_time):
+                    continue
+                if (check_date, check_time) in booked:
+                    continue
+                if not is_valid_date_time(date_to_str(check_date), minutes_to_str(check_time)):
+                    continue
+                return check_date, check_time
         
         return None, None  # No slots available in next 7 days
+
+# Hot-path queries built once with bound parameters, so each call reuses the
+# same statement and its cached compiled SQL
+_SLOT_STMT = db.select(Appointment.id).where(
+    Appointment.date == db.bindparam('date'),
+    Appointment.time_min == db.bindparam('time_min'),
+    Appointment.status == 'confirmed'
+).limit(1)
+
+_USER_APPOINTMENTS_STMT = db.select(Appointment).where(
+    Appointment.phone_number == db.bindparam('phone_number'),
+    Appointment.status == 'confirmed'
+).order_by(Appointment.date, Appointment.time_min)
+
+_BOOKED_SLOTS_STMT = db.select(Appointment.date, Appointment.time_min).where(
+    Appointment.date.between(db.bindparam('start'), db.bindparam('end')),
+    Appointment.status == 'confirmed'
+)
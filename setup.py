@@ -82,6 +82,8 @@ def main():
     print("python main.py")
     print("\nOr with gunicorn:")
     print("gunicorn --bind 0.0.0.0:5000 --reload main:app")
+    print("\nFor production, use preloaded gevent workers:")
+    print("gunicorn -c gunicorn.prod.conf.py app:app")
     print("\nDon't forget to configure your Twilio webhook URL!")
 
 if __name__ == "__main__":